@@ -49,8 +49,10 @@ def define_components(mod):
         within=NonNegativeReals)
     mod.Zone_Power_Injections.append('UnservedLoad')
 
+    # unserved_load_penalty is a scalar, so apply it once to the total
+    # unserved load rather than to each load zone's term.
     mod.UnservedLoadPenalty = Expression(
         mod.TIMEPOINTS,
-        rule=lambda m, tp: sum(m.UnservedLoad[z, tp] *
-            m.unserved_load_penalty for z in m.LOAD_ZONES))
+        rule=lambda m, tp: m.unserved_load_penalty * quicksum(
+            m.UnservedLoad[z, tp] for z in m.LOAD_ZONES))
     mod.Cost_Components_Per_TP.append('UnservedLoadPenalty')
\ No newline at end of file
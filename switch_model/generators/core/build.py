@@ -39,6 +39,7 @@ from pyomo.environ import *
 from switch_model.financials import capital_recovery_factor as crf
 from switch_model.reporting import write_table
 from switch_model.tools.graph import graph
+from switch_model.tools.graph.transmission import get_transmission_df
 from switch_model.utilities.scaling import get_assign_default_value_rule
 
 dependencies = 'switch_model.timescales', 'switch_model.balancing.load_zones',\
@@ -792,10 +793,8 @@ def buildout_map(tools):
     buildout = buildout.groupby(["gen_type", "gen_load_zone"], as_index=False)["value"].sum()
     buildout["value"] *= 1e-3  # Convert to GW
     ax = tools.maps.graph_pie_chart(buildout)
-    transmission = tools.get_dataframe("transmission.csv", convert_dot_to_na=True).fillna(0)
+    transmission = get_transmission_df(tools)
     transmission = transmission.rename({"trans_lz1": "from", "trans_lz2": "to", "TxCapacityNameplate": "value"}, axis=1)
-    transmission = transmission[["from", "to", "value", "PERIOD"]]
-    transmission = transmission.groupby(["from", "to", "PERIOD"], as_index=False).sum().drop("PERIOD", axis=1)
-    # Rename the columns appropriately
+    transmission = transmission.groupby(["from", "to"], as_index=False, observed=True)["value"].sum()
     transmission.value *= 1e-3
     tools.maps.graph_transmission_capacity(transmission, ax=ax, legend=True)
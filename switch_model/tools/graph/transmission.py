@@ -0,0 +1,23 @@
+"""
+Helper code to load the transmission outputs for graphing
+"""
+
+
+def get_transmission_df(tools):
+    """
+    Returns transmission.csv with builds that weren't allowed set to 0.
+    All the graphs that use transmission.csv (in the transmission and
+    generator build modules) load the file through this function so that
+    it is parsed once (with the same arguments) and then served from the
+    graphing tools' cache.
+    """
+    return tools.get_dataframe(
+        "transmission.csv",
+        convert_dot_to_na=True,
+        dtype={
+            "TRANSMISSION_LINE": "category",
+            "trans_lz1": "category",
+            "trans_lz2": "category",
+            "PERIOD": "int32",
+        }
+    ).fillna({"BuildTx": 0})
@@ -28,6 +28,7 @@ from __future__ import division
 
 import os
 from pyomo.environ import *
+from pyomo.core.expr.numeric_expr import LinearExpression
 
 dependencies = 'switch_model.timescales', 'switch_model.balancing.load_zones',\
     'switch_model.financials'
@@ -140,14 +141,30 @@ def define_components(mod):
     mod.BuildLocalTD = Var(
         mod.LOAD_ZONES, mod.PERIODS,
         within=NonNegativeReals)
+
+    def LocalTDCapacity_rule(m, z, period):
+        # Walk the periods in order once per zone, extending a running list
+        # of build variables, so each period's capacity is a single
+        # LinearExpression rather than a fresh sum over all prior periods.
+        try:
+            d = m._LocalTDCapacity_dict
+        except AttributeError:
+            d = m._LocalTDCapacity_dict = dict()
+            for _z in m.LOAD_ZONES:
+                build_vars = []
+                for p in m.PERIODS:
+                    build_vars.append(m.BuildLocalTD[_z, p])
+                    d[_z, p] = LinearExpression(
+                        constant=m.existing_local_td[_z],
+                        linear_coefs=[1] * len(build_vars),
+                        linear_vars=list(build_vars))
+        result = d.pop((z, period))
+        if not d:  # all gone, delete the attribute
+            del m._LocalTDCapacity_dict
+        return result
     mod.LocalTDCapacity = Expression(
         mod.LOAD_ZONES, mod.PERIODS,
-        rule=lambda m, z, period:
-            m.existing_local_td[z]
-            + sum(
-                m.BuildLocalTD[z, bld_yr]
-                for bld_yr in m.CURRENT_AND_PRIOR_PERIODS_FOR_PERIOD[period]
-        )
+        rule=LocalTDCapacity_rule
     )
     mod.distribution_loss_rate = Param(default=0.053, input_file="trans_params.csv")
 
@@ -165,7 +182,7 @@ def define_components(mod):
     mod.LocalTDFixedCosts = Expression(
         mod.PERIODS,
         doc="Summarize annual local T&D costs for the objective function.",
-        rule=lambda m, p: sum(
+        rule=lambda m, p: quicksum(
             m.LocalTDCapacity[z, p] * m.local_td_annual_cost_per_mw[z]
             for z in m.LOAD_ZONES))
     mod.Cost_Components_Per_Period.append('LocalTDFixedCosts')
@@ -176,6 +193,9 @@ def define_components(mod):
         mod.ZONE_TIMEPOINTS,
         within=NonNegativeReals,
         doc="Power withdrawn from a zone's central node sent over local T&D.")
+    # All timepoints in a period reference the same LocalTDCapacity[z, p]
+    # component (a single LinearExpression), so the cumulative build sum is
+    # shared by these constraints rather than rebuilt for each timepoint.
     mod.Enforce_Local_TD_Capacity_Limit = Constraint(
         mod.ZONE_TIMEPOINTS,
         rule=lambda m, z, t:
@@ -205,12 +225,25 @@ def define_dynamic_components(mod):
 
     """
 
+    def Distributed_Energy_Balance_rule(m, z, t):
+        # Look up the registered components once and build the balance for
+        # every zone and timepoint in one pass, instead of calling getattr
+        # for each of them.
+        try:
+            d = m._Distributed_Energy_Balance_dict
+        except AttributeError:
+            injections = [getattr(m, c) for c in m.Distributed_Power_Injections]
+            withdrawals = [getattr(m, c) for c in m.Distributed_Power_Withdrawals]
+            d = m._Distributed_Energy_Balance_dict = {
+                (_z, _t): (
+                    sum(component[_z, _t] for component in injections)
+                    == sum(component[_z, _t] for component in withdrawals))
+                for _z, _t in m.ZONE_TIMEPOINTS
+            }
+        result = d.pop((z, t))
+        if not d:  # all gone, delete the attribute
+            del m._Distributed_Energy_Balance_dict
+        return result
     mod.Distributed_Energy_Balance = Constraint(
         mod.ZONE_TIMEPOINTS,
-        rule=lambda m, z, t: (
-            sum(
-                getattr(m, component)[z, t]
-                for component in m.Distributed_Power_Injections
-            ) == sum(
-                getattr(m, component)[z, t]
-                for component in m.Distributed_Power_Withdrawals)))
\ No newline at end of file
+        rule=Distributed_Energy_Balance_rule)
\ No newline at end of file
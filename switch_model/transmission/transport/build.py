@@ -28,10 +28,13 @@ INPUT FILE FORMAT
 
 import os
 from pyomo.environ import *
+from pyomo.core.expr.numeric_expr import LinearExpression
 from switch_model.financials import capital_recovery_factor as crf
+import numpy as np
 import pandas as pd
 from switch_model.reporting import write_table
 from switch_model.tools.graph import graph
+from switch_model.tools.graph.transmission import get_transmission_df
 
 dependencies = 'switch_model.timescales', 'switch_model.balancing.load_zones',\
     'switch_model.financials'
@@ -223,13 +226,31 @@ def define_components(mod):
         initialize=mod.TRANSMISSION_LINES * mod.PERIODS,
         filter=lambda m, tx, p: m.trans_new_build_allowed[tx] and m.trans_capital_cost_per_mw_km != float("inf"))
     mod.BuildTx = Var(mod.TRANS_BLD_YRS, within=NonNegativeReals)
+
+    def NewTxCapacity_rule(m, tx, period):
+        # Walk the periods in order once per line, extending a running list
+        # of allowed build variables, so each period's new capacity is a
+        # single LinearExpression rather than a filtered sum over all periods.
+        try:
+            d = m._NewTxCapacity_dict
+        except AttributeError:
+            d = m._NewTxCapacity_dict = dict()
+            for _tx in m.TRANSMISSION_LINES:
+                build_vars = []
+                for p in sorted(m.PERIODS):
+                    if (_tx, p) in m.TRANS_BLD_YRS:
+                        build_vars.append(m.BuildTx[_tx, p])
+                    d[_tx, p] = LinearExpression(
+                        linear_coefs=[1] * len(build_vars),
+                        linear_vars=list(build_vars)
+                    ) if build_vars else 0
+        result = d.pop((tx, period))
+        if not d:  # all gone, delete the attribute
+            del m._NewTxCapacity_dict
+        return result
     mod.NewTxCapacity = Expression(
         mod.TRANSMISSION_LINES, mod.PERIODS,
-        rule=lambda m, tx, period: sum(
-            m.BuildTx[tx, bld_yr]
-            for bld_yr in m.PERIODS
-            if bld_yr <= period and (tx, bld_yr) in m.TRANS_BLD_YRS
-        )
+        rule=NewTxCapacity_rule
     )
     mod.TxCapacityNameplate = Expression(
         mod.TRANSMISSION_LINES, mod.PERIODS,
@@ -256,26 +277,53 @@ def define_components(mod):
     # Multiply capital costs by capital recover factor to get annual
     # payments. Add annual fixed O&M that are expressed as a fraction of
     # overnight costs.
+    def trans_cost_annual_init(m, tx):
+        # The annualization factor is the same for every line, so evaluate
+        # it once and compute all the line costs on the first call.
+        try:
+            d = m._trans_cost_annual_dict
+        except AttributeError:
+            annual_factor = value(
+                crf(m.interest_rate, m.trans_lifetime_yrs) + m.trans_fixed_om_fraction)
+            cost_per_mw_km = value(m.trans_capital_cost_per_mw_km)
+            d = m._trans_cost_annual_dict = {
+                _tx: cost_per_mw_km * value(m.trans_terrain_multiplier[_tx]) *
+                value(m.trans_length_km[_tx]) * annual_factor
+                for _tx in m.TRANSMISSION_LINES
+            }
+        result = d.pop(tx)
+        if not d:  # all gone, delete the attribute
+            del m._trans_cost_annual_dict
+        return result
     mod.trans_cost_annual = Param(
         mod.TRANSMISSION_LINES,
         within=NonNegativeReals,
-        initialize=lambda m, tx: (
-            m.trans_capital_cost_per_mw_km * m.trans_terrain_multiplier[tx] *
-            m.trans_length_km[tx] * (crf(m.interest_rate, m.trans_lifetime_yrs) +
-                m.trans_fixed_om_fraction)))
+        initialize=trans_cost_annual_init)
     # An expression to summarize annual costs for the objective
     # function. Units should be total annual future costs in $base_year
     # real dollars. The objective function will convert these to
     # base_year Net Present Value in $base_year real dollars.
     mod.TxLineCosts = Expression(
-        mod.TRANSMISSION_LINES, mod.PERIODS,
-        rule=lambda m, tx, p: m.NewTxCapacity[tx, p] * m.trans_cost_annual[tx] if (tx, p) in m.TRANS_BLD_YRS else 0
+        mod.TRANS_BLD_YRS,
+        rule=lambda m, tx, p: m.NewTxCapacity[tx, p] * m.trans_cost_annual[tx]
     )
+
+    def TxFixedCosts_rule(m, p):
+        # Group the buildable lines by period once, so each period only sums
+        # over lines that have costs in that period.
+        try:
+            d = m._TxFixedCosts_dict
+        except AttributeError:
+            d = m._TxFixedCosts_dict = {_p: [] for _p in m.PERIODS}
+            for tx, _p in m.TRANS_BLD_YRS:
+                d[_p].append(tx)
+        result = quicksum(m.TxLineCosts[tx, p] for tx in d.pop(p))
+        if not d:  # all gone, delete the attribute
+            del m._TxFixedCosts_dict
+        return result
     mod.TxFixedCosts = Expression(
         mod.PERIODS,
-        rule=lambda m, p: sum(
-            m.TxLineCosts[tx, p] for tx in m.TRANSMISSION_LINES
-        )
+        rule=TxFixedCosts_rule
     )
     mod.Cost_Components_Per_Period.append('TxFixedCosts')
 
@@ -288,17 +336,40 @@ def define_components(mod):
     mod.DIRECTIONAL_TX = Set(
         dimen=2,
         initialize=init_DIRECTIONAL_TX)
+
+    def init_TX_CONNECTIONS_TO_ZONE(m, lz):
+        # Find every zone's neighbors in one pass over the lines rather than
+        # scanning all the directional paths for each zone.
+        try:
+            d = m._TX_CONNECTIONS_TO_ZONE_dict
+        except AttributeError:
+            d = m._TX_CONNECTIONS_TO_ZONE_dict = {_lz: set() for _lz in m.LOAD_ZONES}
+            for tx in m.TRANSMISSION_LINES:
+                d[m.trans_lz1[tx]].add(m.trans_lz2[tx])
+                d[m.trans_lz2[tx]].add(m.trans_lz1[tx])
+        result = d.pop(lz)
+        if not d:  # all gone, delete the attribute
+            del m._TX_CONNECTIONS_TO_ZONE_dict
+        return result
     mod.TX_CONNECTIONS_TO_ZONE = Set(
         mod.LOAD_ZONES,
         ordered=False,
-        initialize=lambda m, lz: set(
-            z for z in m.LOAD_ZONES if (z,lz) in m.DIRECTIONAL_TX))
+        initialize=init_TX_CONNECTIONS_TO_ZONE)
 
     def init_trans_d_line(m, zone_from, zone_to):
-        for tx in m.TRANSMISSION_LINES:
-            if((m.trans_lz1[tx] == zone_from and m.trans_lz2[tx] == zone_to) or
-               (m.trans_lz2[tx] == zone_from and m.trans_lz1[tx] == zone_to)):
-                return tx
+        # Map both directions of every line once rather than searching all
+        # transmission lines for each directional path.
+        try:
+            d = m._trans_d_line_dict
+        except AttributeError:
+            d = m._trans_d_line_dict = dict()
+            for tx in m.TRANSMISSION_LINES:
+                d.setdefault((m.trans_lz1[tx], m.trans_lz2[tx]), tx)
+                d.setdefault((m.trans_lz2[tx], m.trans_lz1[tx]), tx)
+        result = d.pop((zone_from, zone_to))
+        if not d:  # all gone, delete the attribute
+            del m._trans_d_line_dict
+        return result
     mod.trans_d_line = Param(
         mod.DIRECTIONAL_TX,
         within=mod.TRANSMISSION_LINES,
@@ -307,33 +378,62 @@ def define_components(mod):
 
 def post_solve(instance, outdir):
     mod = instance
-    tx_build_df = pd.DataFrame([
-        {
-            "TRANSMISSION_LINE": tx,
-            "PERIOD": p,
-            "trans_lz1": mod.trans_lz1[tx],
-            "trans_lz2": mod.trans_lz2[tx],
-            "trans_dbid": mod.trans_dbid[tx],
-            "trans_length_km": mod.trans_length_km[tx],
-            "trans_efficiency": mod.trans_efficiency[tx],
-            "trans_derating_factor": mod.trans_derating_factor[tx],
-            "existing_trans_cap": mod.existing_trans_cap[tx],
-            "BuildTx": value(mod.BuildTx[tx, p]) if (tx, p) in mod.BuildTx else ".",
-            "TxCapacityNameplate": value(mod.TxCapacityNameplate[tx, p]),
-            "TxCapacityNameplateAvailable": value(mod.TxCapacityNameplateAvailable[tx, p]),
-            "TotalAnnualCost": value(mod.TxLineCosts[tx, p])
-        } for tx, p in mod.TRANSMISSION_LINES * mod.PERIODS
-    ])
+    lines = list(mod.TRANSMISSION_LINES)
+    # Sorted like NewTxCapacity, so the running sum of builds below gives
+    # the same capacity as the model even if PERIODS isn't in order.
+    periods = sorted(mod.PERIODS)
+    num_lines, num_periods = len(lines), len(periods)
+
+    # Extract the solution into typed [line, period] arrays and assemble the
+    # table column-wise rather than row by row.
+    build_tx = np.full((num_lines, num_periods), np.nan)
+    for i, tx in enumerate(lines):
+        for j, p in enumerate(periods):
+            if (tx, p) in mod.BuildTx:
+                build_tx[i, j] = value(mod.BuildTx[tx, p])
+    existing = np.array([mod.existing_trans_cap[tx] for tx in lines], dtype=float)
+    derating = np.array([mod.trans_derating_factor[tx] for tx in lines], dtype=float)
+    cost_annual = np.array([mod.trans_cost_annual[tx] for tx in lines], dtype=float)
+
+    # Cumulate the builds and derive capacity and costs with array operations
+    # instead of evaluating the capacity and cost expressions for every line
+    # and period. TxLineCosts only exists where builds are allowed.
+    new_capacity = np.cumsum(np.nan_to_num(build_tx), axis=1)
+    nameplate = new_capacity + existing[:, None]
+    nameplate_available = nameplate * derating[:, None]
+    annual_cost = np.where(np.isnan(build_tx), 0.0, new_capacity * cost_annual[:, None])
+
+    def per_line(param):
+        return np.repeat([param[tx] for tx in lines], num_periods)
+
+    tx_build_df = pd.DataFrame({
+        "TRANSMISSION_LINE": np.repeat(lines, num_periods),
+        "PERIOD": np.tile(periods, num_lines),
+        "trans_lz1": per_line(mod.trans_lz1),
+        "trans_lz2": per_line(mod.trans_lz2),
+        "trans_dbid": per_line(mod.trans_dbid),
+        "trans_length_km": per_line(mod.trans_length_km),
+        "trans_efficiency": per_line(mod.trans_efficiency),
+        "trans_derating_factor": per_line(mod.trans_derating_factor),
+        "existing_trans_cap": per_line(mod.existing_trans_cap),
+        "BuildTx": build_tx.ravel(),
+        "TxCapacityNameplate": nameplate.ravel(),
+        "TxCapacityNameplateAvailable": nameplate_available.ravel(),
+        "TotalAnnualCost": annual_cost.ravel(),
+    })
     tx_build_df.set_index(["TRANSMISSION_LINE", "PERIOD"], inplace=True)
-    write_table(instance, df=tx_build_df, output_file=os.path.join(outdir, "transmission.csv"))
+    # BuildTx stays float64 (NaN where builds aren't allowed); the "." used in
+    # the rest of Switch's outputs is only substituted in the copy that's written.
+    write_table(instance, df=tx_build_df.fillna({"BuildTx": "."}),
+        output_file=os.path.join(outdir, "transmission.csv"))
 
 @graph(
     "transmission_capacity",
     title="Transmission capacity per period"
 )
 def transmission_capacity(tools):
-    transmission = tools.get_dataframe("transmission.csv", convert_dot_to_na=True).fillna(0)
-    transmission = transmission.groupby("PERIOD", as_index=False).sum()
+    transmission = get_transmission_df(tools)
+    transmission = transmission.groupby("PERIOD", as_index=False)[["TxCapacityNameplate", "BuildTx"]].sum()
     transmission["Existing Capacity"] = transmission["TxCapacityNameplate"] - transmission["BuildTx"]
     transmission = transmission[["PERIOD", "Existing Capacity", "BuildTx"]]
     transmission = transmission.set_index("PERIOD")
@@ -358,7 +458,7 @@ def transmission_capacity(tools):
 def transmission_map(tools):
     if not tools.maps.can_make_maps():
         return
-    transmission = tools.get_dataframe("transmission.csv", convert_dot_to_na=True).fillna(0)
+    transmission = get_transmission_df(tools)
     # Keep only the last period
     last_period = transmission["PERIOD"].max()
     transmission = transmission[transmission["PERIOD"] == last_period].drop("PERIOD", axis=1)
@@ -373,13 +473,12 @@ def transmission_map(tools):
     title="New transmission capacity built across all periods (in GW)",
     note="Lines with <0.1 GW built not shown."
 )
-def transmission_map(tools):
+def transmission_buildout(tools):
     if not tools.maps.can_make_maps():
         return
-    transmission = tools.get_dataframe("transmission.csv", convert_dot_to_na=True).fillna(0)
+    transmission = get_transmission_df(tools)
     transmission = transmission.rename({"trans_lz1": "from", "trans_lz2": "to", "BuildTx": "value"}, axis=1)
-    transmission = transmission[["from", "to", "value", "PERIOD"]]
-    transmission = transmission.groupby(["from", "to", "PERIOD"], as_index=False).sum().drop("PERIOD", axis=1)
-    # Rename the columns appropriately
+    # Total the new capacity across all periods
+    transmission = transmission.groupby(["from", "to"], as_index=False, observed=True)["value"].sum()
     transmission.value *= 1e-3
-    tools.maps.graph_transmission_capacity(transmission)
\ No newline at end of file
+    tools.maps.graph_transmission_capacity(transmission)
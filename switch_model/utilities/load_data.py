@@ -33,6 +33,9 @@ def register_component_for_loading(component, input_file, input_column, input_op
 def load_registered_inputs(switch_data, inputs_dir):
     """
     Gets called to load all the inputs that are registered.
+
+    Components are grouped by file, so a file shared by several modules (e.g.
+    the scalar params in trans_params.csv) is parsed in a single load.
     """
     for file, components in _registered_components.items():
         # We use lists since load_aug is going to convert to a list in any case
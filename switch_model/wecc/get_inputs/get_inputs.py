@@ -9,50 +9,181 @@ That code was removed however it can still be found at this commit
 """
 
 # Standard packages
+import csv
 import os
 import shutil
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, List
 
 # Switch packages
-import pandas as pd
-
 from switch_model.wecc.get_inputs.scenario import load_scenario_from_config
 from switch_model.wecc.utilities import connect
 from switch_model.version import __version__
 
 
-def write_csv_from_query(cursor, fname: str, headers: List[str], query: str):
-    """Create CSV file from cursor."""
-    print(f"\t{fname}.csv... ", flush=True, end="")
-    cursor.execute(query)
-    data = cursor.fetchall()
-    write_csv(data, fname, headers, log=False)
-    print(len(data))
-    if not data:
+# Buffer size (bytes) used when writing the csv files
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Wind-to-solar ratio assumed without the wind_to_solar_ratio constraint,
+# see write_wind_to_solar_ratio().
+WIND_TO_SOLAR_CUTOFF_RATIO = 0.28
+WIND_TO_SOLAR_CUTOFF_WARNING = (
+    "To determine the sign of the wind-to-solar ratio constraint we have "
+    f"assumed that without the constraint, the wind-to-solar ratio is {WIND_TO_SOLAR_CUTOFF_RATIO}. "
+    f"This value was accurate for Martin's LDES runs however it may not be accurate for you. "
+    f"You should update this value in get_inputs or manually specify whether you want a greater than "
+    f"or a less than constraint."
+)
+
+
+def write_csv_from_query(cursor, fname: str, headers: List[str], query: str, query_params=None):
+    """Create CSV file from cursor.
+
+    query_params are bound to the %(name)s placeholders in query by the driver.
+
+    Rows are written in the order the query returns them and are never
+    re-sorted in Python, so any ORDER BY is paid once, on the database.
+    """
+    cursor.execute(query, query_params)
+    num_rows = write_csv(cursor, fname, headers, log=False)
+    print(f"\t{fname}.csv... {num_rows}")
+    if not num_rows:
         warnings.warn(f"File {fname} is empty.")
 
 
 def write_csv(data: Iterable[List], fname, headers: List[str], log=True):
-    """Create CSV file from Iterable."""
+    """Create CSV file from Iterable. Returns the number of rows written."""
     if log:
         print(f"\t{fname}.csv... ", flush=True, end="")
-    with open(fname + ".csv", "w") as f:
-        f.write(",".join(headers) + "\n")
+    num_rows = 0
+
+    def clean_rows():
+        nonlocal num_rows
         for row in data:
-            # Replace None values with dots for Pyomo. Also turn all datatypes into strings
-            row_as_clean_strings = [
-                "." if element is None else str(element) for element in row
-            ]
-            f.write(
-                ",".join(row_as_clean_strings) + "\n"
-            )  # concatenates "line" separated by commas, and appends \n
+            num_rows += 1
+            # Replace None values with dots for Pyomo. Rows without any None
+            # values are passed through to csv.writer without being copied.
+            if None in row:
+                yield ("." if element is None else element for element in row)
+            else:
+                yield row
+
+    # Use a large buffer so big tables are written in a few large chunks
+    with open(fname + ".csv", "w", newline="", buffering=WRITE_BUFFER_SIZE) as f:
+        # csv.writer converts the values to strings in C rather than in Python
+        # and writerows() drives the loop over the rows from C as well.
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(headers)
+        writer.writerows(clean_rows())
     if log:
-        print(len(data))
+        print(num_rows)
+    return num_rows
+
+
+def write_csv_from_copy(cursor, fname: str, headers: List[str], query: str, query_params=None):
+    """
+    Create CSV file by having Postgres format the query results
+    (COPY ... TO STDOUT). The rows are streamed straight into the file
+    without creating Python objects for each row. NULL values are written
+    as dots for Pyomo.
+
+    Postgres writes booleans as t/f and a literal "." value gets quoted, so
+    queries returning either still go through write_csv_from_query().
+
+    As with write_csv_from_query(), the row order is the query's. Pyomo only
+    depends on it for ordered sets (e.g. timepoints.csv); the ORDER BY
+    clauses on the other queries just keep the files reproducible.
+    """
+    # COPY doesn't take parameters, so bind them with the driver's quoting first
+    if query_params is not None:
+        query = cursor.mogrify(query, query_params).decode()
+    query = query.strip().rstrip(";")
+    # psycopg2 calls f.write() once per row of COPY data, so the file is kept
+    # buffered; unbuffered it would make a system call for every row.
+    with open(fname + ".csv", "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write((",".join(headers) + "\n").encode())
+        cursor.copy_expert(
+            f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '.')", f
+        )
+    print(f"\t{fname}.csv... {cursor.rowcount}")
+    if not cursor.rowcount:
+        warnings.warn(f"File {fname} is empty.")
+
+
+def create_temp_generation_plant_ids(cursor, params):
+    """
+    Create temporary table called temp_generation_plant_ids
+    This table has one column (generation_plant_id) containing
+    the plant ids for this scenario
+    This table can be used to filter out unused generation plants as follow
+    WHERE generation_plant_id IN (SELECT generation_plant_id FROM temp_generation_plant_ids)
+
+    Temporary tables only exist within the connection (session) that created
+    them, so this must be run on every connection that uses the table. It is
+    kept as a temporary table (rather than a shared unlogged one) so that
+    concurrent get_inputs runs can't interfere with each other.
+    """
+    cursor.execute(
+        """
+        -- The primary key indexes the ids and removes the duplicates
+        -- between the two sources below as they're inserted.
+        CREATE TEMPORARY TABLE temp_generation_plant_ids (
+            generation_plant_id integer PRIMARY KEY
+        );
+        
+        INSERT INTO temp_generation_plant_ids
+            SELECT generation_plant_id
+        FROM generation_plant_scenario_member
+            WHERE generation_plant_scenario_id=%(generation_plant_scenario_id)s
+        UNION ALL
+        SELECT generation_plant_id
+            FROM generation_plant_scenario_group_member
+            JOIN generation_plant_group_member USING (generation_plant_group_id)
+                WHERE generation_plant_scenario_id=%(generation_plant_scenario_id)s
+        ON CONFLICT DO NOTHING;
 
+        -- Collect statistics so that the planner can pick good join plans
+        -- for the queries that filter on this table.
+        ANALYZE temp_generation_plant_ids;
+        """,
+        vars(params),
+    )
 
-# List of modules that is used to generate modules.txt
-modules = [
+
+def run_exports(exports, params, num_connections: int = 4):
+    """
+    Run the (write function, fname, headers, query) exports concurrently
+    over a small pool of database connections, so that the database works on
+    several queries at once rather than one after the other. The scenario
+    params are bound to the %(name)s placeholders in the queries.
+    """
+    local = threading.local()
+    connections = []
+
+    def run(export):
+        # Each worker thread opens its own connection the first time it runs
+        if not hasattr(local, "cursor"):
+            db_conn = connect()
+            connections.append(db_conn)
+            local.cursor = db_conn.cursor()
+            create_temp_generation_plant_ids(local.cursor, params)
+        write_function, *args = export
+        write_function(local.cursor, *args, query_params=vars(params))
+
+    try:
+        with ThreadPoolExecutor(max_workers=num_connections) as executor:
+            # list() raises any exception from the workers
+            list(executor.map(run, exports))
+    finally:
+        for db_conn in connections:
+            db_conn.close()
+
+
+# Modules that are always included in modules.txt. query_db() adds the
+# optional modules to its own copy of this list.
+BASE_MODULES = (
     # Core modules
     "switch_model",
     "switch_model.timescales",
@@ -74,7 +205,7 @@ modules = [
     # "switch_model.reporting.basic_exports_wecc",
     # Always include since by default it does nothing except output useful data
     "switch_model.policies.wind_to_solar_ratio",
-]
+)
 
 
 def query_db(config, skip_cf):
@@ -91,8 +222,7 @@ def query_db(config, skip_cf):
     # Write general scenario parameters into a documentation file
     print("\tscenario_params.txt...")
     with open("scenario_params.txt", "w") as f:
-        for param, val in params.__dict__.items():
-            f.write(f"{param}: {val}\n")
+        f.write("".join(f"{param}: {val}\n" for param, val in params.__dict__.items()))
 
     ########################################################
     # Which input specification are we writing against?
@@ -101,39 +231,22 @@ def query_db(config, skip_cf):
         f.write(f"{__version__}\n")
 
     ########################################################
-    # Create temporary table called temp_generation_plant_ids
-    # This table has one column (generation_plant_id) containing
-    # the plant ids for this scenario
-    # This table can be joined on to filter out unused generation plants as follow
-    # JOIN temp_generation_plant_ids USING(generation_plant_id)
-    db_cursor.execute(
-        f"""
-        CREATE TEMPORARY TABLE temp_generation_plant_ids (
-            generation_plant_id integer
-        );
-        
-        INSERT INTO temp_generation_plant_ids (
-            SELECT generation_plant_id
-        FROM generation_plant_scenario_member
-            WHERE generation_plant_scenario_id={params.generation_plant_scenario_id}
-        UNION
-        SELECT generation_plant_id
-            FROM generation_plant_scenario_group_member
-            JOIN generation_plant_group_member USING (generation_plant_group_id)
-                WHERE generation_plant_scenario_id={params.generation_plant_scenario_id}
-        );
-        """
-    )
+    # The queries below are queued in exports and run concurrently by
+    # run_exports() once they have all been defined.
+    exports = []
+
+    # Modules to write to modules.txt
+    modules = list(BASE_MODULES)
 
     ########################################################
     # TIMESCALES
 
     # periods.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "periods",
         ["INVESTMENT_PERIOD", "period_start", "period_end"],
-        f"""
+        """
         select
           label  as label, --This is to fix build year problem
           start_year as period_start,
@@ -141,16 +254,18 @@ def query_db(config, skip_cf):
         from
           period
         where
-          study_timeframe_id = {params.study_timeframe_id}
+          study_timeframe_id = %(study_timeframe_id)s
         order by
           1;
         """,
-    )
+    ))
 
     # timeseries.csv
+    # The timeseries labels are defined once here so that timeseries.csv and
+    # timepoints.csv always use the same labels.
     timeseries_id_select = "date_part('year', first_timepoint_utc)|| '_' || replace(sampled_timeseries.name, ' ', '_') as timeseries"
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "timeseries",
         [
             "TIMESERIES",
@@ -162,9 +277,7 @@ def query_db(config, skip_cf):
         # TODO what's happening here
         f"""
             select
-              date_part('year', first_timepoint_utc)|| '_' || replace(
-                sampled_timeseries.name, ' ', '_'
-              ) as timeseries,
+              {timeseries_id_select},
               t.label  as ts_period,
               hours_per_tp as ts_duration_of_tp,
               num_timepoints as ts_num_tps,
@@ -173,43 +286,41 @@ def query_db(config, skip_cf):
               sampled_timeseries
               join period as t using(period_id, study_timeframe_id)
             where
-              sampled_timeseries.time_sample_id = {params.time_sample_id}
-              and sampled_timeseries.study_timeframe_id = {params.study_timeframe_id}
+              sampled_timeseries.time_sample_id = %(time_sample_id)s
+              and sampled_timeseries.study_timeframe_id = %(study_timeframe_id)s
             order by
                 label desc,
                 timeseries asc;""",
-    )
+    ))
 
     # timepoints.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "timepoints",
         ["timepoint_id", "timestamp", "timeseries"],
         f"""
             select
               raw_timepoint_id as timepoint_id,
               to_char(timestamp_utc, 'YYYYMMDDHH24') as timestamp,
-              date_part('year', first_timepoint_utc)|| '_' || replace(
-                sampled_timeseries.name, ' ', '_'
-              ) as timeseries
+              {timeseries_id_select}
             from
               sampled_timepoint as t
               join sampled_timeseries using(
                 sampled_timeseries_id, study_timeframe_id
               )
             where
-              t.time_sample_id = {params.time_sample_id}
-              and t.study_timeframe_id = {params.study_timeframe_id}
+              t.time_sample_id = %(time_sample_id)s
+              and t.study_timeframe_id = %(study_timeframe_id)s
             order by
               1;
             """,
-    )
+    ))
 
     ########################################################
     # LOAD ZONES
 
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "load_zones",
         ["LOAD_ZONE", "zone_ccs_distance_km", "zone_dbid"],
         """
@@ -221,30 +332,30 @@ def query_db(config, skip_cf):
         WHERE name != '_ALL_ZONES'
         ORDER BY 1;
         """,
-    )
+    ))
 
     # loads.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "loads",
         ["LOAD_ZONE", "TIMEPOINT", "zone_demand_mw"],
-        f"""
+        """
             select load_zone_name, t.raw_timepoint_id as timepoint,
                 CASE WHEN demand_mw < 0 THEN 0 ELSE demand_mw END as zone_demand_mw
             from sampled_timepoint as t
                 join demand_timeseries as d using(raw_timepoint_id)
-            where t.time_sample_id={params.time_sample_id}
-                and demand_scenario_id={params.demand_scenario_id}
+            where t.time_sample_id=%(time_sample_id)s
+                and demand_scenario_id=%(demand_scenario_id)s
             order by 1,2;
             """,
-    )
+    ))
 
     ########################################################
     # BALANCING AREAS [Pending zone_coincident_peak_demand.csv]
 
     # balancing_areas.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "balancing_areas",
         [
             "BALANCING_AREAS",
@@ -265,18 +376,18 @@ def query_db(config, skip_cf):
             spinning_res_wind_frac,
             spinning_res_solar_frac
         FROM balancing_areas;""",
-    )
+    ))
 
     # zone_balancing_areas.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "zone_balancing_areas",
         ["LOAD_ZONE", "balancing_area"],
         """
         SELECT
             name, reserves_area as balancing_area
         FROM load_zone;""",
-    )
+    ))
 
     # Paty: in this version of switch this tables is named zone_coincident_peak_demand.csv
     # PATY: PENDING csv!
@@ -300,8 +411,8 @@ def query_db(config, skip_cf):
     # TRANSMISSION
 
     # transmission_lines.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "transmission_lines",
         [
             "TRANSMISSION_LINE",
@@ -326,11 +437,11 @@ def query_db(config, skip_cf):
          WHERE start_load_zone_id < end_load_zone_id
          ORDER BY 2,3;
          """,
-    )
+    ))
 
     # trans_params.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "trans_params",
         [
             "trans_capital_cost_per_mw_km",
@@ -338,22 +449,22 @@ def query_db(config, skip_cf):
             "trans_fixed_om_fraction",
         ],
         # See Issue #80 for reasoning behind the 85 year lifetime.
-        f"""
+        """
         SELECT trans_capital_cost_per_mw_km,
             85 as trans_lifetime_yrs,
             0.03 as trans_fixed_om_fraction
         FROM transmission_base_capital_cost
-        WHERE transmission_base_capital_cost_scenario_id = {params.transmission_base_capital_cost_scenario_id}
+        WHERE transmission_base_capital_cost_scenario_id = %(transmission_base_capital_cost_scenario_id)s
         ORDER BY 1;
         """,
-    )
+    ))
 
     ########################################################
     # FUEL
 
     # fuels.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "fuels",
         ["fuel", "co2_intensity", "upstream_co2_intensity"],
         """
@@ -361,12 +472,12 @@ def query_db(config, skip_cf):
         FROM energy_source
         WHERE is_fuel IS TRUE;
         """,
-    )
+    ))
 
     # non_fuel_energy_sources.csv
 
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "non_fuel_energy_sources",
         ["energy_source"],
         """
@@ -374,31 +485,23 @@ def query_db(config, skip_cf):
         FROM energy_source
         WHERE is_fuel IS FALSE;
         """,
-    )
+    ))
 
     # Fuel projections are yearly averages in the DB. For now, Switch only accepts fuel prices per period, so they are averaged.
     # fuel_cost.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "fuel_cost",
         ["load_zone", "fuel", "period", "fuel_cost"],
-        f"""
-        select load_zone_name as load_zone, fuel, period  as period, AVG(fuel_price) as fuel_cost
-		from (
-		    select load_zone_name, fuel, fuel_price, projection_year,
-		        (
-		            case when projection_year >= period.start_year
-					and projection_year <= period.start_year + length_yrs -1 then label else 0 end
-				) as period
-				from fuel_simple_price_yearly
-				join period on(projection_year>=start_year)
-				where study_timeframe_id = {params.study_timeframe_id} and fuel_simple_scenario_id = {params.fuel_simple_price_scenario_id}
-		) as w
-		where period!=0
-		group by load_zone_name, fuel, period
-		order by 1,2,3;
+        """
+        select load_zone_name as load_zone, fuel, label as period, AVG(fuel_price) as fuel_cost
+        from fuel_simple_price_yearly
+            join period on(projection_year between start_year and start_year + length_yrs - 1)
+        where study_timeframe_id = %(study_timeframe_id)s and fuel_simple_scenario_id = %(fuel_simple_price_scenario_id)s
+        group by load_zone_name, fuel, label
+        order by 1,2,3;
 		""",
-    )
+    ))
 
     ########################################################
     # GENERATORS
@@ -409,8 +512,8 @@ def query_db(config, skip_cf):
     #        gen_ccs_capture_efficiency,
     #        gen_is_distributed
     # generation_projects_info.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "generation_projects_info",
         [
             "GENERATION_PROJECT",
@@ -437,7 +540,7 @@ def query_db(config, skip_cf):
             "gen_land_use_rate",
             "gen_storage_energy_to_power_ratio",
         ],
-        f"""
+        """
             select
             t.generation_plant_id,
             t.gen_tech,
@@ -465,22 +568,22 @@ def query_db(config, skip_cf):
             gen_storage_energy_to_power_ratio
             from generation_plant as t
             join load_zone as t2 using(load_zone_id)
-            JOIN temp_generation_plant_ids USING(generation_plant_id)
             join variable_o_m_costs as vom
             on vom.gen_tech = t.gen_tech
             and vom.energy_source = t.energy_source
             join generation_plant_technologies as gt
             on gt.gen_tech = t.gen_tech
             and gt.energy_source = t.energy_source
-            where variable_o_m_cost_scenario_id = {params.variable_o_m_cost_scenario_id}
-            and generation_plant_technologies_scenario_id = {params.generation_plant_technologies_scenario_id}
+            where variable_o_m_cost_scenario_id = %(variable_o_m_cost_scenario_id)s
+            and generation_plant_technologies_scenario_id = %(generation_plant_technologies_scenario_id)s
+            and t.generation_plant_id IN (SELECT generation_plant_id FROM temp_generation_plant_ids)
             order by gen_dbid;
             """,
-    )
+    ))
 
     # gen_build_predetermined.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "gen_build_predetermined",
         [
             "GENERATION_PROJECT",
@@ -488,18 +591,18 @@ def query_db(config, skip_cf):
             "gen_predetermined_cap",
             "gen_predetermined_storage_energy_mwh",
         ],
-        f"""select generation_plant_id, build_year, capacity as gen_predetermined_cap, gen_predetermined_storage_energy_mwh
+        """select generation_plant_id, build_year, capacity as gen_predetermined_cap, gen_predetermined_storage_energy_mwh
                 from generation_plant_existing_and_planned
                 join generation_plant as t using(generation_plant_id)
-                JOIN temp_generation_plant_ids USING(generation_plant_id)
-                WHERE generation_plant_existing_and_planned_scenario_id={params.generation_plant_existing_and_planned_scenario_id}
+                WHERE generation_plant_existing_and_planned_scenario_id=%(generation_plant_existing_and_planned_scenario_id)s
+                AND generation_plant_id IN (SELECT generation_plant_id FROM temp_generation_plant_ids)
                 ;
                 """,
-    )
+    ))
 
     # gen_build_costs.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "gen_build_costs",
         [
             "GENERATION_PROJECT",
@@ -508,30 +611,42 @@ def query_db(config, skip_cf):
             "gen_fixed_om",
             "gen_storage_energy_overnight_cost",
         ],
-        f"""
-        select generation_plant_id, generation_plant_cost.build_year,
+        """
+        -- Scan generation_plant_cost once, tagging each row with the period its
+        -- build year falls in (if any) and whether the plant is predetermined.
+        WITH plant_cost AS (
+            SELECT generation_plant_id, gpc.build_year, overnight_cost, fixed_o_m,
+                storage_energy_capacity_cost_per_mwh, period.label AS period,
+                EXISTS (
+                    SELECT 1 FROM generation_plant_existing_and_planned AS eap
+                    WHERE eap.generation_plant_id = gpc.generation_plant_id
+                      AND eap.generation_plant_existing_and_planned_scenario_id=%(generation_plant_existing_and_planned_scenario_id)s
+                ) AS is_predetermined
+            FROM generation_plant_cost AS gpc
+              JOIN generation_plant USING(generation_plant_id)
+              LEFT JOIN period ON(
+                gpc.build_year >= start_year AND gpc.build_year <= end_year
+                AND period.study_timeframe_id=%(study_timeframe_id)s
+              )
+            WHERE gpc.generation_plant_cost_scenario_id=%(generation_plant_cost_scenario_id)s
+              AND gpc.generation_plant_id IN (SELECT generation_plant_id FROM temp_generation_plant_ids)
+        )
+        -- Costs for every build year of predetermined plants
+        SELECT generation_plant_id, build_year,
             overnight_cost as gen_overnight_cost, fixed_o_m as gen_fixed_om,
             storage_energy_capacity_cost_per_mwh as gen_storage_energy_overnight_cost
-        FROM generation_plant_cost
-          JOIN generation_plant_existing_and_planned USING (generation_plant_id)
-          JOIN temp_generation_plant_ids USING(generation_plant_id)
-          join generation_plant as t1 using(generation_plant_id)
-        WHERE generation_plant_cost.generation_plant_cost_scenario_id={params.generation_plant_cost_scenario_id}
-          AND generation_plant_existing_and_planned_scenario_id={params.generation_plant_existing_and_planned_scenario_id}
+        FROM plant_cost
+        WHERE is_predetermined
         UNION
-        SELECT generation_plant_id, period.label,
+        -- Average costs over the build years in each period
+        SELECT generation_plant_id, period,
             avg(overnight_cost) as gen_overnight_cost, avg(fixed_o_m) as gen_fixed_om,
             avg(storage_energy_capacity_cost_per_mwh) as gen_storage_energy_overnight_cost
-        FROM generation_plant_cost
-          JOIN generation_plant using(generation_plant_id)
-          JOIN period on(build_year>=start_year and build_year<=end_year)
-          JOIN temp_generation_plant_ids USING(generation_plant_id)
-          join generation_plant as t1 using(generation_plant_id)
-        WHERE period.study_timeframe_id={params.study_timeframe_id} 
-          AND generation_plant_cost.generation_plant_cost_scenario_id={params.generation_plant_cost_scenario_id}
+        FROM plant_cost
+        WHERE period IS NOT NULL
         GROUP BY 1,2
         ORDER BY 1,2;""",
-    )
+    ))
 
     ########################################################
     # FINANCIALS
@@ -549,11 +664,11 @@ def query_db(config, skip_cf):
 
     # variable_capacity_factors.csv
     if not skip_cf:
-        write_csv_from_query(
-            db_cursor,
+        exports.append((
+            write_csv_from_copy,
             "variable_capacity_factors",
             ["GENERATION_PROJECT", "timepoint", "gen_max_capacity_factor"],
-            f"""
+            """
                 select
                     generation_plant_id,
                     t.raw_timepoint_id,
@@ -561,11 +676,11 @@ def query_db(config, skip_cf):
                     -- performance wise this doesn't have any significant impact
                     case when abs(capacity_factor) < 0.00001 then 0 else capacity_factor end
                 FROM variable_capacity_factors_exist_and_candidate_gen v
-                    JOIN temp_generation_plant_ids USING(generation_plant_id)
                     JOIN sampled_timepoint as t ON(t.raw_timepoint_id = v.raw_timepoint_id)
-                WHERE t.time_sample_id={params.time_sample_id};
+                WHERE t.time_sample_id=%(time_sample_id)s
+                    AND v.generation_plant_id IN (SELECT generation_plant_id FROM temp_generation_plant_ids);
                 """,
-        )
+        ))
 
     ########################################################
     # HYDROPOWER
@@ -585,62 +700,76 @@ def query_db(config, skip_cf):
     # zone + watershed. Eventually, we may rethink this derating, but it is a reasonable
     # approximation for a large hydro fleet where plant outages are individual random events.
     # Negative flows are replaced by 0.
-    write_csv_from_query(
-        db_cursor,
-        "hydro_timepoints",
-        ["timepoint_id", "tp_to_hts"],
-        f"""
-        SELECT 
-            tp.raw_timepoint_id AS timepoint_id, 
-            p.label || '_M' || date_part('month', timestamp_utc) AS tp_to_hts
-        FROM switch.sampled_timepoint AS tp
-            JOIN switch.period AS p USING(period_id, study_timeframe_id)
-        WHERE time_sample_id = {params.time_sample_id}
-            AND study_timeframe_id = {params.study_timeframe_id}
-        ORDER BY 1;
-        """,
-    )
-
-    write_csv_from_query(
-        db_cursor,
-        "hydro_timeseries",
-        ["hydro_project", "timeseries", "hydro_min_flow_mw", "hydro_avg_flow_mw"],
-        f"""
-        SELECT 
-            generation_plant_id AS hydro_project,
-            hts.hydro_timeseries,
-            CASE
-                WHEN hydro_min_flow_mw <= 0 THEN 0
-                ELSE least(hydro_min_flow_mw, capacity_limit_mw * (1-forced_outage_rate)) END,
-            CASE
-                WHEN hydro_avg_flow_mw <= 0 THEN 0
-                ELSE least(hydro_avg_flow_mw, capacity_limit_mw * (1-forced_outage_rate)) END
-            AS hydro_avg_flow_mw
-        FROM (
-            SELECT DISTINCT
-                date_part('month', tp.timestamp_utc) as month,
-                date_part('year', tp.timestamp_utc) as year, 
+    def write_hydro(cursor, query_params):
+        # Both hydro files use the same timepoint -> hydro timeseries labels,
+        # so build them once in a temporary table and write the two files
+        # one after the other on this connection (temp tables are only
+        # visible to the session that created them).
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE temp_hts AS
+            SELECT
+                tp.raw_timepoint_id AS timepoint_id,
+                date_part('month', timestamp_utc)::int AS month,
+                date_part('year', timestamp_utc)::int AS year,
                 p.label || '_M' || date_part('month', timestamp_utc) AS hydro_timeseries
             FROM switch.sampled_timepoint AS tp
                 JOIN switch.period AS p USING(period_id, study_timeframe_id)
-            WHERE time_sample_id = {params.time_sample_id}
-                AND study_timeframe_id = {params.study_timeframe_id}
-        ) AS hts
-            JOIN switch.hydro_historical_monthly_capacity_factors USING(month, year)
-            JOIN switch.generation_plant USING(generation_plant_id)
-            JOIN temp_generation_plant_ids USING(generation_plant_id)
-        WHERE hydro_simple_scenario_id={params.hydro_simple_scenario_id}
-        ORDER BY 1;
-        """,
-    )
+            WHERE time_sample_id = %(time_sample_id)s
+                AND study_timeframe_id = %(study_timeframe_id)s;
+            
+            ANALYZE temp_hts;
+            """,
+            query_params,
+        )
+
+        write_csv_from_copy(
+            cursor,
+            "hydro_timepoints",
+            ["timepoint_id", "tp_to_hts"],
+            """
+            SELECT timepoint_id, hydro_timeseries AS tp_to_hts
+            FROM temp_hts
+            ORDER BY 1;
+            """,
+        )
+
+        write_csv_from_copy(
+            cursor,
+            "hydro_timeseries",
+            ["hydro_project", "timeseries", "hydro_min_flow_mw", "hydro_avg_flow_mw"],
+            """
+            SELECT 
+                generation_plant_id AS hydro_project,
+                hts.hydro_timeseries,
+                CASE
+                    WHEN hydro_min_flow_mw <= 0 THEN 0
+                    ELSE least(hydro_min_flow_mw, capacity_limit_mw * (1-forced_outage_rate)) END,
+                CASE
+                    WHEN hydro_avg_flow_mw <= 0 THEN 0
+                    ELSE least(hydro_avg_flow_mw, capacity_limit_mw * (1-forced_outage_rate)) END
+                AS hydro_avg_flow_mw
+            FROM (
+                SELECT DISTINCT month, year, hydro_timeseries FROM temp_hts
+            ) AS hts
+                JOIN switch.hydro_historical_monthly_capacity_factors USING(month, year)
+                JOIN switch.generation_plant USING(generation_plant_id)
+            WHERE hydro_simple_scenario_id=%(hydro_simple_scenario_id)s
+                AND generation_plant_id IN (SELECT generation_plant_id FROM temp_generation_plant_ids)
+            ORDER BY 1;
+            """,
+            query_params,
+        )
+
+    exports.append((write_hydro,))
 
     ########################################################
     # CARBON CAP
 
     # future work: join with table with carbon_cost_dollar_per_tco2
     # carbon_policies.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "carbon_policies",
         [
             "PERIOD",
@@ -648,46 +777,34 @@ def query_db(config, skip_cf):
             "carbon_cap_tco2_per_yr_CA",
             "carbon_cost_dollar_per_tco2",
         ],
-        f"""
-        select period, AVG(carbon_cap_tco2_per_yr) as carbon_cap_tco2_per_yr, AVG(carbon_cap_tco2_per_yr_CA) as carbon_cap_tco2_per_yr_CA,
+        """
+        select label as period, AVG(carbon_cap_tco2_per_yr) as carbon_cap_tco2_per_yr, AVG(carbon_cap_tco2_per_yr_CA) as carbon_cap_tco2_per_yr_CA,
             '.' as  carbon_cost_dollar_per_tco2
-        from
-        (select carbon_cap_tco2_per_yr, carbon_cap_tco2_per_yr_CA, year,
-                (case when
-                year >= period.start_year
-                and year <= period.start_year + length_yrs -1 then label else 0 end) as period
-                from carbon_cap
-                join period on(year>=start_year)
-                where study_timeframe_id = {params.study_timeframe_id} and carbon_cap_scenario_id = {params.carbon_cap_scenario_id}) as w
-        where period!=0
-        group by period
+        from carbon_cap
+            join period on(year between start_year and start_year + length_yrs - 1)
+        where study_timeframe_id = %(study_timeframe_id)s and carbon_cap_scenario_id = %(carbon_cap_scenario_id)s
+        group by label
         order by 1;
         """,
-    )
+    ))
 
     ########################################################
     # RPS
     if params.rps_scenario_id is not None:
         # rps_targets.csv
-        write_csv_from_query(
-            db_cursor,
+        exports.append((
+            write_csv_from_query,
             "rps_targets",
             ["load_zone", "period", "rps_target"],
-            f"""
-            select load_zone, w.period as period, avg(rps_target) as rps_target
-                    from
-                    (select load_zone, rps_target,
-                    (case when
-                    year >= period.start_year
-                    and year <= period.start_year + length_yrs -1 then label else 0 end) as period
-                    from rps_target
-                    join period on(year>=start_year)
-                    where study_timeframe_id = {params.study_timeframe_id} and rps_scenario_id = {params.rps_scenario_id}) as w
-            where period!=0
-            group by load_zone, period
+            """
+            select load_zone, label as period, avg(rps_target) as rps_target
+            from rps_target
+                join period on(year between start_year and start_year + length_yrs - 1)
+            where study_timeframe_id = %(study_timeframe_id)s and rps_scenario_id = %(rps_scenario_id)s
+            group by load_zone, label
             order by 1, 2;
             """,
-        )
+        ))
         modules.append("switch_model.policies.rps_unbundled")
 
     ########################################################
@@ -695,8 +812,8 @@ def query_db(config, skip_cf):
 
     if params.supply_curves_scenario_id is not None:
         # fuel_supply_curves.csv
-        write_csv_from_query(
-            db_cursor,
+        exports.append((
+            write_csv_from_query,
             "fuel_supply_curves",
             [
                 "regional_fuel_market",
@@ -705,7 +822,7 @@ def query_db(config, skip_cf):
                 "unit_cost",
                 "max_avail_at_cost",
             ],
-            f"""
+            """
                 select regional_fuel_market, label as period, tier, unit_cost,
                         (case when max_avail_at_cost is null then 'inf'
                             else max_avail_at_cost::varchar end) as max_avail_at_cost
@@ -718,69 +835,76 @@ def query_db(config, skip_cf):
                     unit_cost > 1e9
                     and max_avail_at_cost is null
                 )
-                and study_timeframe_id = {params.study_timeframe_id}
-                and supply_curves_scenario_id = {params.supply_curves_scenario_id};
+                and study_timeframe_id = %(study_timeframe_id)s
+                and supply_curves_scenario_id = %(supply_curves_scenario_id)s;
                             """,
-        )
+        ))
 
     # regional_fuel_markets.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "regional_fuel_markets",
         ["regional_fuel_market", "fuel"],
-        f"""
+        """
         select regional_fuel_market, fuel
         from regional_fuel_market
-        where regional_fuel_market_scenario_id={params.regional_fuel_market_scenario_id};
+        where regional_fuel_market_scenario_id=%(regional_fuel_market_scenario_id)s;
                     """,
-    )
+    ))
 
     # zone_to_regional_fuel_market.csv
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_query,
         "zone_to_regional_fuel_market",
         ["load_zone", "regional_fuel_market"],
-        f"""
+        """
         select load_zone, regional_fuel_market
         from zone_to_regional_fuel_market
-        where regional_fuel_market_scenario_id={params.regional_fuel_market_scenario_id};
+        where regional_fuel_market_scenario_id=%(regional_fuel_market_scenario_id)s;
                     """,
-    )
+    ))
 
     ########################################################
     # DEMAND RESPONSE
     if params.enable_dr is not None:
-        write_csv_from_query(
-            db_cursor,
+        exports.append((
+            write_csv_from_copy,
             "dr_data",
             ["LOAD_ZONE", "timepoint", "dr_shift_down_limit", "dr_shift_up_limit"],
-            f"""
+            """
+                -- Share of the demand that can be shifted down, for the load
+                -- zones 10 to 21 and for the other zones, in each year.
+                with dr_shift_factors (is_zone_10_to_21, year, factor) as (
+                    values
+                        (true, 2020, 0.003),
+                        (true, 2030, 0.02),
+                        (true, 2040, 0.07),
+                        (true, 2050, 0.1),
+                        (false, 2020, 0),
+                        (false, 2030, 0.03),
+                        (false, 2040, 0.02),
+                        (false, 2050, 0.07)
+                )
                 select load_zone_name as load_zone, sampled_timepoint.raw_timepoint_id AS timepoint,
-                case
-                    when load_zone_id>=10 and load_zone_id<=21 and extract(year from sampled_timepoint.timestamp_utc)=2020 then 0.003*demand_mw
-                    when load_zone_id>=10 and load_zone_id<=21 and extract(year from sampled_timepoint.timestamp_utc)=2030 then 0.02*demand_mw
-                    when load_zone_id>=10 and load_zone_id<=21 and extract(year from sampled_timepoint.timestamp_utc)=2040 then 0.07*demand_mw
-                    when load_zone_id>=10 and load_zone_id<=21 and extract(year from sampled_timepoint.timestamp_utc)=2050 then 0.1*demand_mw
-                    when (load_zone_id<10 or load_zone_id>21) and extract(year from sampled_timepoint.timestamp_utc)=2020 then 0*demand_mw
-                    when (load_zone_id<10 or load_zone_id>21) and extract(year from sampled_timepoint.timestamp_utc)=2030 then 0.03*demand_mw
-                    when (load_zone_id<10 or load_zone_id>21) and extract(year from sampled_timepoint.timestamp_utc)=2040 then 0.02*demand_mw
-                    when (load_zone_id<10 or load_zone_id>21) and extract(year from sampled_timepoint.timestamp_utc)=2050 then 0.07*demand_mw
-                end as dr_shift_down_limit,
+                f.factor*demand_mw as dr_shift_down_limit,
                 NULL as dr_shift_up_limit
                 from sampled_timepoint
                 left join demand_timeseries on sampled_timepoint.raw_timepoint_id=demand_timeseries.raw_timepoint_id
-                where demand_scenario_id = {params.demand_scenario_id}
-                and study_timeframe_id = {params.study_timeframe_id}
+                left join dr_shift_factors as f
+                    on f.is_zone_10_to_21 = (load_zone_id between 10 and 21)
+                    and f.year = extract(year from sampled_timepoint.timestamp_utc)
+                where demand_scenario_id = %(demand_scenario_id)s
+                and study_timeframe_id = %(study_timeframe_id)s
                 order by demand_scenario_id, load_zone_id, sampled_timepoint.raw_timepoint_id;
                             """,
-        )
+        ))
 
     ########################################################
     # ELECTRICAL VEHICLES
     if params.enable_ev is not None:
         # ev_limits.csv
-        write_csv_from_query(
-            db_cursor,
+        exports.append((
+            write_csv_from_copy,
             "ev_limits",
             [
                 "LOAD_ZONE",
@@ -789,7 +913,7 @@ def query_db(config, skip_cf):
                 "ev_cumulative_charge_upper_mwh",
                 "ev_charge_limit_mw",
             ],
-            f"""
+            """
                 SELECT load_zone_name as load_zone, raw_timepoint_id as timepoint,
                 (CASE
                     WHEN raw_timepoint_id=max_raw_timepoint_id THEN ev_cumulative_charge_upper_mwh
@@ -797,116 +921,110 @@ def query_db(config, skip_cf):
                 END) AS ev_cumulative_charge_lower_mwh,
                 ev_cumulative_charge_upper_mwh,
                 ev_charge_limit as ev_charge_limit_mw
-                FROM(
-                --Table sample_points: with the sample points
+                FROM ev_profiles_per_timepoint_v3
+                JOIN (
+                    -- The sampled timepoints, each tagged with the last
+                    -- raw_timepoint_id of its sampled timeseries
                     SELECT
-                        load_zone_id,
-                        ev_profiles_per_timepoint_v3.raw_timepoint_id,
-                        sampled_timeseries_id,
-                        sampled_timepoint.timestamp_utc,
-                        load_zone_name,
-                        ev_cumulative_charge_lower_mwh,
-                        ev_cumulative_charge_upper_mwh,
-                        ev_charge_limit  FROM ev_profiles_per_timepoint_v3
-                    LEFT JOIN sampled_timepoint
-                    ON ev_profiles_per_timepoint_v3.raw_timepoint_id = sampled_timepoint.raw_timepoint_id
-                    WHERE study_timeframe_id = {params.study_timeframe_id}
-                    --END sample_points
-                )AS sample_points
-                LEFT JOIN(
-                --Table max_raw: with max raw_timepoint_id per _sample_timesseries_id
-                SELECT
-                    sampled_timeseries_id,
-                    MAX(raw_timepoint_id) AS max_raw_timepoint_id
-                FROM sampled_timepoint
-                WHERE study_timeframe_id = {params.study_timeframe_id}
-                GROUP BY sampled_timeseries_id
-                --END max_raw
-                )AS max_raw
-                ON max_raw.sampled_timeseries_id=sample_points.sampled_timeseries_id
+                        raw_timepoint_id,
+                        MAX(raw_timepoint_id) OVER (PARTITION BY sampled_timeseries_id) AS max_raw_timepoint_id
+                    FROM sampled_timepoint
+                    WHERE study_timeframe_id = %(study_timeframe_id)s
+                ) AS sample_points USING(raw_timepoint_id)
                 ORDER BY load_zone_id, raw_timepoint_id ;
                             """,
-        )
+        ))
 
-    ca_policies(db_cursor, params)
-    write_wind_to_solar_ratio(params.wind_to_solar_ratio)
+    ca_policies(exports, params, modules)
     if params.enable_planning_reserves:
-        planning_reserves(db_cursor, params)
-    create_modules_txt()
+        planning_reserves(exports, params, modules)
+
+    run_exports(exports, params)
+
+    # Reads periods.csv, so this runs once the exports are written
+    write_wind_to_solar_ratio(params.wind_to_solar_ratio)
+    create_modules_txt(modules)
 
     # Make graphing files
     graph_config = os.path.join(os.path.dirname(__file__), "graph_config")
     print("\tgraph_config files...")
     shutil.copytree(graph_config, ".", dirs_exist_ok=True)
 
+
 def write_wind_to_solar_ratio(wind_to_solar_ratio):
     # TODO ideally we'd have a table where we can specify the wind_to_solar_ratios per period.
     #   At the moment only the wind_to_solar_ratio is specified and which doesn't allow different values per period
     if wind_to_solar_ratio is None:
         return
 
-    print("wind_to_solar_ratio.csv...")
-    df = pd.read_csv("periods.csv")[["INVESTMENT_PERIOD"]]
-    df["wind_to_solar_ratio"] = wind_to_solar_ratio
+    # Only the periods are needed, so read them with the csv module rather
+    # than parsing the whole file with pandas.
+    with open("periods.csv", newline="") as f:
+        reader = csv.reader(f)
+        period_col = next(reader).index("INVESTMENT_PERIOD")
+        periods = [row[period_col] for row in reader]
 
     # wind_to_solar_ratio.csv requires a column called wind_to_solar_ratio_const_gt that is True (1) or False (0)
     # This column specifies whether the constraint is a greater than constraint or a less than constraint.
     # In our case we want it to be a greater than constraint if we're trying to force wind-to-solar ratio above its default
     # and we want it to be a less than constraint if we're trying to force the ratio below its default.
     # Here the default is the ratio if we didn't have the constraint.
-    cutoff_ratio = 0.28
-    warnings.warn(
-        "To determine the sign of the wind-to-solar ratio constraint we have "
-        f"assumed that without the constraint, the wind-to-solar ratio is {cutoff_ratio}. "
-        f"This value was accurate for Martin's LDES runs however it may not be accurate for you. "
-        f"You should update this value in get_inputs or manually specify whether you want a greater than "
-        f"or a less than constraint."
+    warnings.warn(WIND_TO_SOLAR_CUTOFF_WARNING)
+    const_gt = int(wind_to_solar_ratio > WIND_TO_SOLAR_CUTOFF_RATIO)
+
+    write_csv(
+        ((period, wind_to_solar_ratio, const_gt) for period in periods),
+        "wind_to_solar_ratio",
+        ["INVESTMENT_PERIOD", "wind_to_solar_ratio", "wind_to_solar_ratio_const_gt"],
     )
-    df["wind_to_solar_ratio_const_gt"] = 1 if wind_to_solar_ratio > cutoff_ratio else 0
 
-    df.to_csv("wind_to_solar_ratio.csv", index=False)
 
-def ca_policies(db_cursor, scenario_params):
+# ca_policies.csv queries, keyed by ca_policies_scenario_id
+CA_POLICIES_QUERIES = {
+    # scenario_id 0 means
+    # "Cali must generate 80% of its load at each timepoint for all periods that have generation in 2030 or later"
+    0: """
+    select
+      p.label  as PERIOD, --This is to fix build year problem
+      case when p.end_year >= 2030 then 0.8 end as ca_min_gen_timepoint_ratio,
+      null as ca_min_gen_period_ratio,
+      null as carbon_cap_tco2_per_yr_CA
+    from
+      period as p
+    where
+      study_timeframe_id = %(study_timeframe_id)s
+    order by
+      1;
+    """,
+    # scenario_id 1 means
+    # "Cali must generate 80% of its load at each timepoint for all periods that have generation in 2030 or later"
+    1: """
+    select
+        p.label  as PERIOD, --This is to fix build year problem
+        null as ca_min_gen_timepoint_ratio,
+        case when p.end_year >= 2030 then 0.8 end as ca_min_gen_period_ratio,
+        null as carbon_cap_tco2_per_yr_CA
+    from
+        period as p
+    where
+        study_timeframe_id = %(study_timeframe_id)s
+    order by
+        1;
+    """,
+}
+
+
+def ca_policies(exports, scenario_params, modules):
     if scenario_params.ca_policies_scenario_id is None:
         return
-    elif scenario_params.ca_policies_scenario_id == 0:
-        # scenario_id 0 means
-        # "Cali must generate 80% of its load at each timepoint for all periods that have generation in 2030 or later"
-        query = f"""
-        select
-          p.label  as PERIOD, --This is to fix build year problem
-          case when p.end_year >= 2030 then 0.8 end as ca_min_gen_timepoint_ratio,
-          null as ca_min_gen_period_ratio,
-          null as carbon_cap_tco2_per_yr_CA
-        from
-          period as p
-        where
-          study_timeframe_id = {scenario_params.study_timeframe_id}
-        order by
-          1;
-        """
-    elif scenario_params.ca_policies_scenario_id == 1:
-        # scenario_id 1 means
-        # "Cali must generate 80% of its load at each timepoint for all periods that have generation in 2030 or later"
 
-        query = f"""
-        select
-            p.label  as PERIOD, --This is to fix build year problem
-            null as ca_min_gen_timepoint_ratio,
-            case when p.end_year >= 2030 then 0.8 end as ca_min_gen_period_ratio,
-            null as carbon_cap_tco2_per_yr_CA
-        from
-            period as p
-        where
-            study_timeframe_id = {scenario_params.study_timeframe_id}
-        order by
-            1;
-        """
-    else:
+    try:
+        query = CA_POLICIES_QUERIES[scenario_params.ca_policies_scenario_id]
+    except KeyError:
         raise Exception(f"Unknown ca_policies_scenario_id {scenario_params.ca_policies_scenario_id}")
 
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "ca_policies",
         [
             "PERIOD",
@@ -915,57 +1033,63 @@ def ca_policies(db_cursor, scenario_params):
             "carbon_cap_tco2_per_yr_CA",
         ],
         query,
-    )
+    ))
 
     modules.append("switch_model.policies.CA_policies")
 
 
-def planning_reserves(db_cursor, scenario_params):
+def planning_reserves(exports, scenario_params, modules):
     # reserve_capacity_value.csv specifies the capacity factors that should be used when calculating
     # the reserves. By default, the capacity factor defaults to gen_max_capacity_factor for renewable
     # projects with variable output and 1.0 for other plants. This is all fine except for hydropower
     # where it doesn't make sense for the reserve capacity factor to be 1.0 since hydropower
     # is limited by hydro_avg_flow_mw. Therefore, we override the default of 1.0 for hydropower
     # generation and instead set the capacity factor as the hydro_avg_flow_mw / capacity_limit_mw.
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "reserve_capacity_value",
         ["GENERATION_PROJECT", "timepoint", "gen_capacity_value"],
-        f"""
+        """
         select
             generation_plant_id,
             raw_timepoint_id,
-            -- zero out capacity_factors that are less than 1e-5 in magnitude to simplify the model
-            case when abs(capacity_factor) < 1e-5 then 0 else capacity_factor end
+            capacity_factor
         from sampled_timepoint as t
         left join (
-            select generation_plant_id, year, month, hydro_avg_flow_mw / capacity_limit_mw as capacity_factor
-            from hydro_historical_monthly_capacity_factors
-            left join generation_plant
-                using(generation_plant_id)
-            where hydro_simple_scenario_id = {scenario_params.hydro_simple_scenario_id}
+            -- The factors are cleaned up here, once per plant and month,
+            -- rather than for every timepoint that the month is joined to.
+            select generation_plant_id, year, month,
+                -- zero out capacity_factors that are less than 1e-5 in magnitude to simplify the model
+                case when abs(capacity_factor) < 1e-5 then 0 else capacity_factor end as capacity_factor
+            from (
+                select generation_plant_id, year, month, hydro_avg_flow_mw / capacity_limit_mw as capacity_factor
+                from hydro_historical_monthly_capacity_factors
+                left join generation_plant
+                    using(generation_plant_id)
+                where hydro_simple_scenario_id = %(hydro_simple_scenario_id)s
+            ) as cf
         ) as h
             on (
                 month = date_part('month', timestamp_utc) and
                 year = date_part('year', timestamp_utc)
             )
-        where time_sample_id = {scenario_params.time_sample_id};
-        """
-    )
+        where time_sample_id = %(time_sample_id)s;
+        """,
+    ))
 
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "planning_reserve_requirement_zones",
         ["PLANNING_RESERVE_REQUIREMENT", "LOAD_ZONE"],
         """
         SELECT
             planning_reserve_requirement, load_zone
         FROM planning_reserve_zones
-        """
-    )
+        """,
+    ))
 
-    write_csv_from_query(
-        db_cursor,
+    exports.append((
+        write_csv_from_copy,
         "planning_reserve_requirements",
         [
             "PLANNING_RESERVE_REQUIREMENT",
@@ -976,14 +1100,14 @@ def planning_reserves(db_cursor, scenario_params):
         SELECT
             planning_reserve_requirement, prr_cap_reserve_margin, prr_enforcement_timescale
         FROM planning_reserve_requirements
-        """
-    )
+        """,
+    ))
 
     modules.append("switch_model.balancing.planning_reserves")
 
 
-def create_modules_txt():
+def create_modules_txt(modules):
     print("\tmodules.txt...")
+    # dict.fromkeys drops any module listed twice while keeping the order
     with open("modules.txt", "w") as f:
-        for module in modules:
-            f.write(module + "\n")
+        f.write("".join(module + "\n" for module in dict.fromkeys(modules)))
@@ -39,7 +39,8 @@ def load_scenario_from_config(config, db_cursor) -> ScenarioParams:
     db_cursor.execute(
         f"""SELECT {",".join(param_names)}
             FROM scenario
-            WHERE scenario_id = {params.scenario_id};"""
+            WHERE scenario_id = %s;""",
+        (params.scenario_id,),
     )
     db_values = list(db_cursor.fetchone())
 